@@ -1,112 +1,719 @@
 import pdfplumber
+import pypdfium2 as pdfium
 import pytesseract
+import numpy as np
 from PIL import Image
 from io import BytesIO
 from docx import Document
-from fpdf import FPDF
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+import diskcache
+import hashlib
+import importlib.metadata
 import os
+import tempfile
+import queue
+import threading
+import concurrent.futures
+import collections
+import itertools
+
+# OCR runs in the pool workers, one tesseract per core, so each one is kept to a single
+# OpenMP thread instead of every process spawning a thread per core. It has to be set
+# before libtesseract is loaded; the tesseract executable inherits it. An explicit
+# OMP_THREAD_LIMIT in the environment still wins.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+# tesserocr binds libtesseract directly, so the model is loaded once per process.
+# It is optional because it has no prebuilt wheels on Windows; without it OCR
+# goes through the tesseract executable via pytesseract.
+try:
+    from tesserocr import PyTessBaseAPI, OEM, PSM
+except ImportError:
+    PyTessBaseAPI = None
+
+# Numba is optional too; without it binarization uses the vectorized NumPy version.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# PaddleOCR (engine='paddle') is optional as well and only its 2.x API is supported:
+# 3.x replaced use_gpu with device, dropped show_log and changed what ocr() returns.
+# The version is read from the package metadata, which is cheap, while paddle itself is
+# only imported once OCR actually runs.
+def _check_paddleocr():
+    """
+    Checks that a supported PaddleOCR version is installed.
+    :raises RuntimeError: If paddleocr is missing or is not a 2.x release.
+    """
+    try:
+        version = importlib.metadata.version('paddleocr')
+    except importlib.metadata.PackageNotFoundError:
+        raise RuntimeError("PaddleOCR is not installed. Install 'paddleocr<3' or use engine='tesseract'.")
+    if int(version.split('.')[0]) >= 3:
+        raise RuntimeError(f"engine='paddle' needs paddleocr 2.x, found {version}. Install 'paddleocr<3'.")
 
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
+# Each worker process keeps its own extractor, so pages can be looked up by number
+# without reparsing the document for every task and the OCR engine and cache are
+# set up once per worker.
+_worker_extractor = None
+
+def _init_worker(pdf_path, ocr_dpi, engine, ocr_cache_dir):
+    """
+    Opens the PDF once per worker process.
+    :param pdf_path: Path to the PDF file.
+    :param ocr_dpi: Resolution used to render pages for OCR.
+    :param engine: OCR engine name.
+    :param ocr_cache_dir: Folder of the on-disk cache of OCR results.
+    """
+    global _worker_extractor
+    _worker_extractor = PDFExtractor(pdf_path, ocr_dpi, engine, ocr_cache_dir)
+
+def _extract_with_plumber(page):
+    """
+    Extracts text from a single page using pdfplumber, preserving layout.
+    :param page: A pdfplumber page object.
+    :return: Extracted text as a string.
+    """
+    try:
+        text = page.extract_text(x_tolerance=1, y_tolerance=1, layout=True)
+        if not text and page.chars:
+            # The page has a text layer even though the layout pass came back empty,
+            # so plain extraction is still far cheaper than OCR.
+            text = page.extract_text(x_tolerance=1, y_tolerance=1)
+        return text if text else ""
+    except Exception as e:
+        print(f"Error extracting with pdfplumber on page {page.page_number}: {e}")
+        return ""
+
+def _render_page(pdf, page_number, dpi=300):
+    """
+    Renders a page to a grayscale array in-process with pdfium.
+    The array is a view of the bitmap's buffer, so the page is never copied, and the
+    pdfium page and bitmap handles are released right away instead of on garbage collection.
+    :param pdf: A pypdfium2 PdfDocument.
+    :param page_number: 1-based page number.
+    :param dpi: Rendering resolution.
+    :return: A 2D uint8 array.
+    """
+    page = pdf[page_number - 1]
+    try:
+        bitmap = page.render(scale=dpi / 72, grayscale=True)
+        # The buffer is allocated by Python, so the view keeps it alive after close().
+        arr = bitmap.to_numpy()
+        bitmap.close()
+    finally:
+        page.close()
+    return arr
+
+# A page is treated as blank when fewer than this fraction of its pixels are dark.
+_BLANK_PAGE_DENSITY = 0.0001
+_DARK_PIXEL_LEVEL = 200
+
+def _is_blank(arr):
+    """
+    Checks whether a rendered page has too little ink to be worth sending to Tesseract.
+    :param arr: A 2D uint8 grayscale array.
+    :return: True if the page is blank.
+    """
+    density = np.count_nonzero(arr < _DARK_PIXEL_LEVEL) / arr.size
+    return density < _BLANK_PAGE_DENSITY
+
+def _otsu_threshold(hist):
+    """
+    Computes Otsu's threshold from a 256-bin grayscale histogram.
+    :param hist: Pixel counts per gray level.
+    :return: The gray level that maximizes the between-class variance.
+    """
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist, dtype=np.float64)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_sum = np.cumsum(hist * levels)
+    mean_bg = cum_sum / np.maximum(weight_bg, 1)
+    mean_fg = (cum_sum[-1] - cum_sum) / np.maximum(weight_fg, 1)
+    variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(variance))
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _otsu_and_binarize(arr):
+        """
+        Computes the Otsu threshold and binarizes the image in compiled code.
+        :param arr: A 2D uint8 grayscale array.
+        :return: A 2D uint8 array containing only 0 and 255.
+        """
+        rows, cols = arr.shape
+        hist = np.zeros(256, dtype=np.int64)
+        for y in range(rows):
+            for x in range(cols):
+                hist[arr[y, x]] += 1
+
+        total = rows * cols
+        sum_all = 0.0
+        for level in range(256):
+            sum_all += level * hist[level]
+        weight_bg = 0.0
+        sum_bg = 0.0
+        best_variance = -1.0
+        threshold = 0
+        for level in range(256):
+            weight_bg += hist[level]
+            if weight_bg == 0:
+                continue
+            weight_fg = total - weight_bg
+            if weight_fg == 0:
+                break
+            sum_bg += level * hist[level]
+            mean_bg = sum_bg / weight_bg
+            mean_fg = (sum_all - sum_bg) / weight_fg
+            variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+            if variance > best_variance:
+                best_variance = variance
+                threshold = level
+
+        binary = np.empty((rows, cols), dtype=np.uint8)
+        for y in range(rows):
+            for x in range(cols):
+                binary[y, x] = 255 if arr[y, x] > threshold else 0
+        return binary
+
+def _binarize(arr):
+    """
+    Binarizes a grayscale image so Tesseract can skip its own thresholding.
+    :param arr: A 2D uint8 grayscale array.
+    :return: A black and white PIL image in mode 'L'.
+    """
+    if numba is not None:
+        binary = _otsu_and_binarize(arr)
+    else:
+        hist = np.bincount(arr.ravel(), minlength=256)
+        threshold = _otsu_threshold(hist)
+        # Scale the boolean mask in place rather than allocating two more page-sized arrays.
+        binary = (arr > threshold).view(np.uint8)
+        binary *= 255
+    return Image.fromarray(binary, mode='L')
+
+def _iter_rendered(pdf, page_numbers, dpi, prefetch=3, binarize=True):
+    """
+    Renders and binarizes pages on a background thread while the caller runs OCR on earlier ones.
+    The bounded queue caps how many rendered pages are held in memory at once.
+    Blank pages are skipped, so they are never sent to Tesseract.
+    :param pdf: A pypdfium2 PdfDocument. Only the background thread touches it while iterating.
+    :param page_numbers: 1-based numbers of the pages to render.
+    :param dpi: Rendering resolution.
+    :param prefetch: Maximum number of rendered pages waiting to be consumed.
+    :param binarize: Whether to binarize the pages or pass them on in grayscale.
+    :return: A generator of (page_number, image) tuples in page order, without blank pages.
+    """
+    rendered = queue.Queue(maxsize=prefetch)
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for page_number in page_numbers:
+                if cancelled.is_set():
+                    break
+                arr = _render_page(pdf, page_number, dpi)
+                if _is_blank(arr):
+                    continue
+                # fromarray wraps the contiguous buffer without copying it.
+                rendered.put((page_number, _binarize(arr) if binarize else Image.fromarray(arr, mode='L')))
+        finally:
+            rendered.put(None)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        producer = executor.submit(produce)
+        try:
+            while (item := rendered.get()) is not None:
+                yield item
+            # Re-raise any rendering error from the background thread.
+            producer.result()
+        finally:
+            cancelled.set()
+            # Unblock the producer if the consumer stopped early.
+            while not producer.done():
+                try:
+                    rendered.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+def _confidence_by_image(data):
+    """
+    Computes the mean word confidence of each image in a Tesseract TSV result.
+    :param data: Tesseract TSV output parsed into a dictionary of columns.
+    :return: A dictionary with 1-based image numbers as keys and mean confidence as values.
+    """
+    if not data:
+        return {}
+    page_nums = np.asarray(data['page_num'], dtype=np.int64)
+    confs = np.asarray(data['conf'], dtype=np.float64)
+    words = confs >= 0
+    totals = np.bincount(page_nums[words], weights=confs[words])
+    counts = np.bincount(page_nums[words])
+    return {int(n): float(totals[n] / counts[n]) for n in np.flatnonzero(counts)}
+
+def _ocr_cache_key(image, backend, dpi):
+    """
+    Builds the OCR cache key of a rendered page from a hash of its pixels.
+    Identical pages, such as repeated letterheads or disclaimers, map to the same key.
+    :param image: The rendered page as a PIL image.
+    :param backend: OCR backend and its settings (one of the _*_CACHE_ID constants),
+        since each of them returns different results.
+    :param dpi: Rendering resolution.
+    :return: A hex digest string.
+    """
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+    digest.update(f"{backend}:{dpi}:{image.mode}:{image.width}x{image.height}".encode())
+    return digest.hexdigest()
+
+def _page_items(data):
+    """
+    Accepts extracted pages either as a dictionary or as an iterable of pairs.
+    :param data: A {page_number: value} dictionary or an iterable of (page_number, value) tuples.
+    :return: An iterable of (page_number, value) tuples.
+    """
+    return data.items() if isinstance(data, dict) else data
+
+def _process_window(page_numbers, ocr):
+    """
+    Extracts a window of pages in a worker process. Every page goes through pdfplumber,
+    then the pages that come back empty share one OCR pass, so OCR runs on all cores.
+    :param page_numbers: 1-based numbers of the pages in the window.
+    :param ocr: Whether to OCR the empty pages here or leave them to the caller.
+    :return: A list of (page_number, text) tuples in page order.
+    """
+    extractor = _worker_extractor
+    window = []
+    for page_number in page_numbers:
+        page = extractor._pdf.pages[page_number - 1]
+        try:
+            window.append((page_number, _extract_with_plumber(page)))
+        finally:
+            # The worker's PDF stays open across windows, so each page's parsed objects
+            # and cached text map are released here or the worker grows with every page.
+            page.close()
+    return list(extractor._fill_with_ocr(window)) if ocr else window
+
+# Pages are OCR'd at ocr_dpi first and rendered again at the fallback resolution
+# when the mean OCR confidence falls below the threshold.
+_OCR_FALLBACK_DPI = 300
+_OCR_MIN_CONFIDENCE = 70
+
+# Pages are handed to the pool workers in windows of this many pages. The pages of a
+# window that need OCR share one OCR pass, so Tesseract's startup is paid once per window,
+# while windows stay small enough to spread a document over all cores.
+_PAGE_WINDOW = 8
+
+# Only this many windows per worker are submitted ahead of the one being yielded, so
+# finished pages waiting for a slow earlier window (or a slow consumer) stay bounded
+# instead of the whole document piling up in memory.
+_WINDOWS_PER_WORKER = 2
+
+# Tesseract settings shared by tesserocr and the tesseract executable: the LSTM
+# engine only (no legacy engine), one uniform text block, and runs of spaces kept
+# so OCR'd text stays column-aligned like the layout-preserved pdfplumber text.
+_TESS_VARIABLES = {'preserve_interword_spaces': '1'}
+_TESS_CONFIG = '--oem 1 --psm 6 -c preserve_interword_spaces=1'
+_TESS_LANG = 'eng'
+_PADDLE_LANG = 'en'
+
+# OCR cache entries are keyed by the backend and its settings as well as the pixels, so
+# changing the backend, language or Tesseract config never serves results made with another.
+_TESSEROCR_CACHE_ID = f"tesserocr:{_TESS_LANG}:{_TESS_CONFIG}"
+_TESSERACT_CACHE_ID = f"tesseract:{_TESS_LANG}:{_TESS_CONFIG}"
+_PADDLE_CACHE_ID = f"paddle:{_PADDLE_LANG}:use_angle_cls"
+
+_HTML_HEADER = """<html><head><meta charset='utf-8'><title>PDF Extraction</title></head><body>
+<style>
+body { font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f0f0f0; }
+.page { position: relative; margin: 20px auto; background-color: #fff; border: 1px solid #ccc; box-shadow: 0 0 10px rgba(0,0,0,0.1); padding: 50px; box-sizing: border-box; }
+.page-text { font-size: 12px; margin: 0; }
+</style>
+"""
+_HTML_FOOTER = "</body></html>"
+# Page text only lands in element content, where escaping &, < and > is enough.
+# str.translate does it in one pass instead of html.escape's chain of replace calls.
+_HTML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+# The layout-preserved text keeps its spacing inside a <pre> block.
+_HTML_PAGE = '<div class="page">\n<h1>Page {page_num}</h1>\n<pre class="page-text">{text}</pre>\n</div>\n'.format
+
+# DOCX pages are written as raw WordprocessingML: a Heading 1 paragraph, the page
+# text in a single run and a page break, the same markup add_heading, add_paragraph
+# and add_page_break produce. Line breaks and tabs become <w:br/> and <w:tab/> as
+# python-docx's run text setter does; control characters XML can't carry are dropped.
+_DOCX_RUN_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+_DOCX_ESCAPE = str.maketrans({
+    **{chr(c): None for c in range(32)},
+    '&': '&amp;', '<': '&lt;', '>': '&gt;',
+    '\n': _DOCX_RUN_BREAK, '\r': _DOCX_RUN_BREAK,
+    '\t': '</w:t><w:tab/><w:t xml:space="preserve">',
+})
+_DOCX_PAGE = (
+    '<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Page {page_num}</w:t></w:r></w:p>'
+    '<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+    '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+).format
+
+class ExtractionError(Exception):
+    """
+    Raised by PDFExtractor.iter_pages when extraction fails after pages were already yielded.
+    """
+
 class PDFExtractor:
     """
     A class to extract text from PDF documents while preserving layout.
     It uses a hybrid approach, combining pdfplumber for digital PDFs and Tesseract for scanned/image-based PDFs.
     """
 
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, ocr_dpi=200, engine='tesseract', ocr_cache_dir='.ocr_cache'):
         """
         Initializes the PDFExtractor with the path to the PDF file.
         :param pdf_path: Path to the PDF file.
+        :param ocr_dpi: Resolution used to render pages for OCR.
+        :param engine: OCR engine, 'tesseract' or 'paddle' (PaddleOCR, runs on the GPU when available).
+        :param ocr_cache_dir: Folder of the on-disk cache of OCR results, shared between runs.
         """
+        if engine not in ('tesseract', 'paddle'):
+            raise ValueError(f"Unknown OCR engine: {engine!r}. Supported engines are: tesseract, paddle.")
+        if engine == 'paddle':
+            _check_paddleocr()
         self.pdf_path = pdf_path
+        self.ocr_dpi = ocr_dpi
+        self.engine = engine
+        self._tess_api = None
+        self._paddle = None
+        self.ocr_cache_dir = ocr_cache_dir
+        self._ocr_cache = None
+        # The document is parsed once here and reused by every extract call until close().
+        self._pdf = None
+        self._pdfium = None
+        self._open_error = None
+        try:
+            self._pdf = pdfplumber.open(pdf_path)
+            self._pdfium = pdfium.PdfDocument(pdf_path)
+        except Exception as e:
+            # Reported by the extract methods, like any other extraction error.
+            self._open_error = e
+
+    def close(self):
+        """Closes the cached PDF handles, the in-process OCR engines and the OCR cache."""
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+        if self._pdfium is not None:
+            self._pdfium.close()
+            self._pdfium = None
+        if self._tess_api is not None:
+            self._tess_api.End()
+            self._tess_api = None
+        self._paddle = None
+        if self._ocr_cache is not None:
+            self._ocr_cache.close()
+            self._ocr_cache = None
+
+    def __enter__(self):
+        return self
 
-    def _extract_with_plumber(self, page):
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_tess_api(self):
         """
-        Extracts text from a single page using pdfplumber, preserving layout.
-        :param page: A pdfplumber page object.
-        :return: Extracted text as a string.
+        Returns the in-process Tesseract API, creating it on first use.
+        :return: A tesserocr PyTessBaseAPI instance.
         """
-        try:
-            text = page.extract_text(x_tolerance=1, y_tolerance=1, layout=True)
-            return text if text else ""
-        except Exception as e:
-            print(f"Error extracting with pdfplumber on page {page.page_number}: {e}")
-            return ""
+        if self._tess_api is None:
+            self._tess_api = PyTessBaseAPI(
+                lang=_TESS_LANG, psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY, variables=_TESS_VARIABLES,
+            )
+        return self._tess_api
+
+    def _get_ocr_cache(self):
+        """
+        Returns the on-disk OCR cache, opening it on first use.
+        Least recently used entries are evicted once it outgrows diskcache's size limit (1 GB by default).
+        :return: A diskcache Cache.
+        """
+        if self._ocr_cache is None:
+            self._ocr_cache = diskcache.Cache(self.ocr_cache_dir, eviction_policy='least-recently-used')
+        return self._ocr_cache
+
+    def _get_paddle(self):
+        """
+        Returns the PaddleOCR engine, creating it on first use.
+        paddleocr is imported here rather than at the top of the module because it is optional
+        and importing paddle is slow, which every pool worker would otherwise pay for.
+        :return: A PaddleOCR instance.
+        """
+        if self._paddle is None:
+            try:
+                from paddleocr import PaddleOCR
+            except ImportError:
+                raise RuntimeError("PaddleOCR is not installed. Install 'paddleocr<3' or use engine='tesseract'.")
+            # use_gpu falls back to the CPU when paddle was built without CUDA.
+            self._paddle = PaddleOCR(use_angle_cls=True, lang=_PADDLE_LANG, use_gpu=True, show_log=False)
+        return self._paddle
 
-    def _extract_with_ocr(self, page):
+    def _ocr_paddle(self, pdf, page_numbers, dpi):
+        """
+        Runs OCR page by page through PaddleOCR.
+        Pages are passed in grayscale since its detection model does its own thresholding.
+        :param pdf: A pypdfium2 PdfDocument.
+        :param page_numbers: 1-based numbers of the pages to OCR.
+        :param dpi: Rendering resolution.
+        :return: A dictionary with page numbers as keys and (text, mean confidence) tuples as values.
         """
-        Performs OCR on a page that is likely an image-based PDF.
-        :param page: A pdfplumber page object.
-        :return: Extracted text as a string.
+        paddle = self._get_paddle()
+        cache = self._get_ocr_cache()
+        extracted_data = {}
+        for page_number, image in _iter_rendered(pdf, page_numbers, dpi, binarize=False):
+            key = _ocr_cache_key(image, _PADDLE_CACHE_ID, dpi)
+            if (cached := cache.get(key)) is not None:
+                extracted_data[page_number] = cached
+                continue
+            try:
+                # Detected lines come back top to bottom as [box, (text, score)] with scores in 0-1.
+                lines = paddle.ocr(np.asarray(image.convert('RGB')), cls=True)[0] or []
+                text = "\n".join(line_text for _, (line_text, _) in lines)
+                conf = 100 * sum(score for _, (_, score) in lines) / len(lines) if lines else 0
+                extracted_data[page_number] = cache[key] = (text, conf)
+            except Exception as e:
+                # A bad page only loses its own OCR, not the rest of the window's.
+                print(f"Error extracting with OCR on page {page_number}: {e}")
+        return extracted_data
+
+    def _ocr_in_process(self, pdf, page_numbers, dpi):
         """
+        Runs OCR page by page through libtesseract, reusing one initialized API.
+        :param pdf: A pypdfium2 PdfDocument.
+        :param page_numbers: 1-based numbers of the pages to OCR.
+        :param dpi: Rendering resolution.
+        :return: A dictionary with page numbers as keys and (text, mean confidence) tuples as values.
+        """
+        api = self._get_tess_api()
+        cache = self._get_ocr_cache()
+        extracted_data = {}
+        for page_number, image in _iter_rendered(pdf, page_numbers, dpi):
+            key = _ocr_cache_key(image, _TESSEROCR_CACHE_ID, dpi)
+            if (cached := cache.get(key)) is not None:
+                extracted_data[page_number] = cached
+                continue
+            try:
+                api.SetImage(image)
+                extracted_data[page_number] = cache[key] = (api.GetUTF8Text(), api.MeanTextConf())
+            except Exception as e:
+                print(f"Error extracting with OCR on page {page_number}: {e}")
+        return extracted_data
+
+    def _ocr_batched(self, pdf, page_numbers, dpi):
+        """
+        Runs OCR on all pages in a single call to the tesseract executable.
+        The pages are rendered to a temporary folder and handed to Tesseract as a list file,
+        so its startup and model loading are paid once per document instead of once per page.
+        :param pdf: A pypdfium2 PdfDocument.
+        :param page_numbers: 1-based numbers of the pages to OCR.
+        :param dpi: Rendering resolution.
+        :return: A dictionary with page numbers as keys and (text, mean confidence) tuples as values.
+        """
+        cache = self._get_ocr_cache()
+        extracted_data = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Only pages missing from the cache go into the list file, in this order.
+            ocr_pages, keys, image_paths = [], [], []
+            # Identical pages (a repeated letterhead or disclaimer) are OCR'd once: only the
+            # first page with a given key goes into the list, the repeats copy its result.
+            first_page_by_key, repeats = {}, []
+            for page_number, image in _iter_rendered(pdf, page_numbers, dpi):
+                key = _ocr_cache_key(image, _TESSERACT_CACHE_ID, dpi)
+                if (cached := cache.get(key)) is not None:
+                    extracted_data[page_number] = cached
+                    continue
+                if key in first_page_by_key:
+                    repeats.append((page_number, first_page_by_key[key]))
+                    continue
+                first_page_by_key[key] = page_number
+                image_path = os.path.join(tmp_dir, f"page_{page_number}.png")
+                image.save(image_path, compress_level=1)
+                ocr_pages.append(page_number)
+                keys.append(key)
+                image_paths.append(image_path)
+            if not image_paths:
+                return extracted_data
+
+            list_path = os.path.join(tmp_dir, "pages.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(image_paths))
+
+            # A single run writes the plain text and the TSV with per-word confidences.
+            output_base = os.path.join(tmp_dir, "ocr")
+            pytesseract.pytesseract.run_tesseract(
+                list_path, output_base, extension='txt', lang=_TESS_LANG,
+                config=f'{_TESS_CONFIG} -c tessedit_create_tsv=1',
+            )
+            with open(f"{output_base}.txt", encoding='utf-8') as f:
+                text = f.read()
+            with open(f"{output_base}.tsv", encoding='utf-8') as f:
+                confidences = _confidence_by_image(pytesseract.pytesseract.file_to_dict(f.read(), '\t', -1))
+        # Tesseract ends the output of every image in the list with a form feed.
+        for image_num, (page_number, key, page_text) in enumerate(zip(ocr_pages, keys, text.split("\f")), start=1):
+            extracted_data[page_number] = cache[key] = (page_text, confidences.get(image_num, 0))
+        for page_number, first_page in repeats:
+            extracted_data[page_number] = extracted_data[first_page]
+        return extracted_data
+
+    def _extract_with_ocr(self, page_numbers):
+        """
+        Performs OCR on pages that are likely image-based.
+        Uses PaddleOCR when engine is 'paddle', otherwise tesserocr when it is installed
+        and a batched pytesseract run if not.
+        Pages recognized with low confidence at ocr_dpi are OCR'd again at a higher resolution.
+        :param page_numbers: 1-based numbers of the pages to OCR.
+        :return: A dictionary with page numbers as keys and extracted text as values.
+        """
+        if self.engine == 'paddle':
+            ocr_pass = self._ocr_paddle
+        elif PyTessBaseAPI is not None:
+            ocr_pass = self._ocr_in_process
+        else:
+            ocr_pass = self._ocr_batched
         try:
-            pil_image = page.to_image(resolution=300).original
-            text = pytesseract.image_to_string(pil_image, lang='eng')
-            return text if text else ""
+            results = ocr_pass(self._pdfium, page_numbers, self.ocr_dpi)
         except pytesseract.TesseractNotFoundError:
             print("Tesseract is not installed or not in your PATH. Please install it.")
-            return ""
+            return {}
         except Exception as e:
-            print(f"Error extracting with OCR on page {page.page_number}: {e}")
-            return ""
+            print(f"Error extracting with OCR: {e}")
+            return {}
+        if self.ocr_dpi < _OCR_FALLBACK_DPI:
+            retry_pages = [page_number for page_number, (_, conf) in results.items()
+                           if conf < _OCR_MIN_CONFIDENCE]
+            if retry_pages:
+                # If the retry fails, the pages keep their first-pass text.
+                try:
+                    results.update(ocr_pass(self._pdfium, retry_pages, _OCR_FALLBACK_DPI))
+                except Exception as e:
+                    print(f"Error retrying OCR at {_OCR_FALLBACK_DPI} DPI: {e}")
+        return {page_number: text for page_number, (text, _) in results.items()}
 
-    def extract_data(self):
+    def _fill_with_ocr(self, window):
         """
-        Main method to extract data from the entire PDF.
-        :return: A dictionary with page numbers as keys and extracted text as values.
+        Runs OCR on the pages of a window that pdfplumber returned no text for.
+        :param window: A list of (page_number, text) tuples.
+        :return: A generator of (page_number, text) tuples in the same order.
         """
-        extracted_data = {}
+        ocr_pages = [page_number for page_number, text in window if not text]
+        ocr_data = self._extract_with_ocr(ocr_pages) if ocr_pages else {}
+        for page_number, text in window:
+            yield page_number, text or ocr_data.get(page_number, text)
+
+    def iter_pages(self):
+        """
+        Extracts the PDF page by page, yielding pages in order as soon as they are ready,
+        so they can be written out while the rest of the document is still being extracted.
+        Pages are processed in parallel, one worker process per CPU core, which also runs
+        the OCR for its pages. PaddleOCR is the exception: it runs here, so the model is
+        loaded onto the GPU only once.
+        :return: A generator of (page_number, text) tuples.
+        :raises ExtractionError: If extraction fails after some pages were already yielded,
+            so callers do not mistake the pages they got for the whole document.
+        """
+        pages_yielded = False
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                for page in pdf.pages:
-                    plumber_text = self._extract_with_plumber(page)
-                    
-                    if plumber_text:
-                        extracted_data[page.page_number] = plumber_text
-                    else:
-                        ocr_text = self._extract_with_ocr(page)
-                        extracted_data[page.page_number] = ocr_text
+            if self._open_error is not None:
+                raise self._open_error
+            page_count = len(self._pdf.pages)
+
+            ocr_in_workers = self.engine != 'paddle'
+            max_workers = os.cpu_count() or 1
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(self.pdf_path, self.ocr_dpi, self.engine, self.ocr_cache_dir),
+            ) as executor:
+                windows = (range(start, min(start + _PAGE_WINDOW, page_count + 1))
+                           for start in range(1, page_count + 1, _PAGE_WINDOW))
+                pending = collections.deque(
+                    executor.submit(_process_window, window, ocr_in_workers)
+                    for window in itertools.islice(windows, max_workers * _WINDOWS_PER_WORKER)
+                )
+                try:
+                    while pending:
+                        window = pending.popleft().result()
+                        for next_window in itertools.islice(windows, 1):
+                            pending.append(executor.submit(_process_window, next_window, ocr_in_workers))
+                        pages_yielded = True
+                        if ocr_in_workers:
+                            yield from window
+                        else:
+                            yield from self._fill_with_ocr(window)
+                finally:
+                    # Stopped early (or failed): drop the windows no worker has started yet.
+                    for future in pending:
+                        future.cancel()
 
             print("PDF extraction completed successfully!")
-            return extracted_data
         except FileNotFoundError:
             print(f"Error: The file at {self.pdf_path} was not found.")
-            return {}
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
+            if pages_yielded:
+                raise ExtractionError(f"Extraction of {self.pdf_path} failed partway through: {e}") from e
+
+    def extract_data(self):
+        """
+        Main method to extract data from the entire PDF.
+        Collects iter_pages into a dictionary; use iter_pages directly to avoid holding every page in memory.
+        :return: A dictionary with page numbers as keys and extracted text as values,
+            or an empty dictionary if the extraction failed.
+        """
+        try:
+            return dict(self.iter_pages())
+        except ExtractionError:
             return {}
     
     def save_to_docx(self, data, output_filename):
-        """Saves the extracted data to a DOCX file."""
+        """
+        Saves the extracted data to a DOCX file.
+        :param data: A {page_number: text} dictionary or an iterable of (page_number, text) tuples.
+        :param output_filename: Path of the DOCX file.
+        """
         document = Document()
-        for page_num, content in data.items():
-            document.add_heading(f"Page {page_num}", level=1)
-            document.add_paragraph(content)
-            document.add_page_break()
+        # Parse every page in one go and splice the paragraphs in ahead of the
+        # section properties, which have to stay the last child of the body.
+        pages = ''.join(_DOCX_PAGE(page_num=page_num, text=content.translate(_DOCX_ESCAPE))
+                        for page_num, content in _page_items(data))
+        body = document.element.body
+        sect_pr = body.sectPr
+        body.extend(parse_xml(f'<w:body {nsdecls("w")}>{pages}</w:body>'))
+        if sect_pr is not None:
+            body.append(sect_pr)
         document.save(output_filename)
         print(f"Data saved to {output_filename} successfully! ")
 
     def save_to_txt(self, data, output_filename):
-        """Saves the extracted data to a TXT file."""
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            for page_num, content in data.items():
-                f.write(f"--- Page {page_num} ---\n")
-                f.write(content)
-                f.write("\n\n")
+        """
+        Saves the extracted data to a TXT file, writing each page as it arrives.
+        :param data: A {page_number: text} dictionary or an iterable of (page_number, text) tuples.
+        :param output_filename: Path of the TXT file.
+        """
+        with open(output_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(f"--- Page {page_num} ---\n{content}\n\n" for page_num, content in _page_items(data))
         print(f"Data saved to {output_filename} successfully! ")
 
     def save_to_html(self, data, output_filename):
-        """Saves the extracted data to an HTML file."""
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        for page_num, content in data.items():
-            pdf.write(5, f"<h1>Page {page_num}</h1>")
-            # Encode the text to handle special characters correctly
-            pdf.multi_cell(0, 5, content.encode('latin-1', 'replace').decode('latin-1'))
-            pdf.add_page()
-        pdf.output(output_filename, 'F')
+        """
+        Saves the extracted data to an HTML file, streaming one page at a time.
+        :param data: A {page_number: text} dictionary or an iterable of (page_number, text) tuples.
+        :param output_filename: Path of the HTML file.
+        """
+        with open(output_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(_HTML_HEADER)
+            for page_num, content in _page_items(data):
+                f.write(_HTML_PAGE(page_num=page_num, text=content.translate(_HTML_ESCAPE)))
+            f.write(_HTML_FOOTER)
         print(f"Data saved to {output_filename} successfully! ")
 
 def main():
@@ -119,24 +726,36 @@ def main():
         print(f"Error: The file '{pdf_path}' does not exist.")
         return
 
-    extractor = PDFExtractor(pdf_path)
-    data = extractor.extract_data()
-
-    if not data:
-        print("No data was extracted. Exiting.")
-        return
-
+    # The output is chosen up front so pages can be written while they are extracted.
     output_filename = input("Enter the desired output filename (e.g., 'report'): ").strip()
     output_format = input("Choose output format (docx, txt, html): ").strip().lower()
-
-    if output_format == 'docx':
-        extractor.save_to_docx(data, f"{output_filename}.docx")
-    elif output_format == 'txt':
-        extractor.save_to_txt(data, f"{output_filename}.txt")
-    elif output_format == 'html':
-        extractor.save_to_html(data, f"{output_filename}.html")
-    else:
+    if output_format not in ('docx', 'txt', 'html'):
         print("Invalid output format chosen. Supported formats are: docx, txt, html.")
+        return
+
+    with PDFExtractor(pdf_path) as extractor:
+        pages = extractor.iter_pages()
+        first_page = next(pages, None)
+
+        if first_page is None:
+            print("No data was extracted. Exiting.")
+            return
+
+        pages = itertools.chain([first_page], pages)
+        output_path = f"{output_filename}.{output_format}"
+        try:
+            if output_format == 'docx':
+                extractor.save_to_docx(pages, output_path)
+            elif output_format == 'txt':
+                extractor.save_to_txt(pages, output_path)
+            else:
+                extractor.save_to_html(pages, output_path)
+        except ExtractionError:
+            # TXT and HTML are written as pages arrive, so drop the truncated file.
+            # DOCX is only saved after the last page, so nothing was written for it.
+            if output_format != 'docx' and os.path.exists(output_path):
+                os.remove(output_path)
+            print(f"Extraction failed partway through; {output_path} was not saved.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,147 +1,668 @@
 import pdfplumber
+from pdfplumber.utils.text import WordExtractor
+import pypdfium2 as pdfium
 import pytesseract
+import numpy as np
 from PIL import Image
 from io import BytesIO
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+import diskcache
+import hashlib
+import importlib.metadata
 import os
-import html
+import tempfile
+import queue
+import threading
+import concurrent.futures
+import collections
+import itertools
 from pathlib import Path
 
+# OCR runs in the pool workers, one tesseract per core, so keep each to one OpenMP thread.
+# Must be set before libtesseract loads; an explicit OMP_THREAD_LIMIT still wins.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+# Optional in-process libtesseract binding (no Windows wheels); falls back to pytesseract.
+try:
+    from tesserocr import PyTessBaseAPI, OEM, PSM, RIL, iterate_level
+except ImportError:
+    PyTessBaseAPI = None
+
+# Optional JIT for binarization; the NumPy version is used without it.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Optional PaddleOCR for engine='paddle', 2.x API only (3.x replaced use_gpu with device,
+# dropped show_log and changed ocr()'s result). Checked via package metadata; paddle itself
+# is imported on first use.
+def _check_paddleocr():
+    try:
+        version = importlib.metadata.version('paddleocr')
+    except importlib.metadata.PackageNotFoundError:
+        raise RuntimeError("PaddleOCR is not installed. Install 'paddleocr<3' or use engine='tesseract'.")
+    if int(version.split('.')[0]) >= 3:
+        raise RuntimeError(f"engine='paddle' needs paddleocr 2.x, found {version}. Install 'paddleocr<3'.")
+
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
+# Created once per worker process by _init_worker: open PDF, OCR engine and cache.
+_worker_extractor = None
+
+def _init_worker(pdf_path, ocr_dpi, engine, ocr_cache_dir):
+    global _worker_extractor
+    _worker_extractor = PDFExtractor(pdf_path, ocr_dpi, engine, ocr_cache_dir)
+
+# Per-word HTML elements are kept column-wise in a structured array rather than as
+# one dict per word: no per-word dict overhead, and page extents are a vectorized max.
+# Boxes are in PDF points; f8 keeps them exactly as pdfplumber and the OCR scaling produce them.
+_SOURCE_PLUMBER, _SOURCE_OCR = 0, 1
+_ELEM_DT = np.dtype([
+    ('text', object), ('x0', 'f8'), ('y0', 'f8'), ('x1', 'f8'), ('y1', 'f8'), ('source', 'u1'),
+])
+_NO_ELEMENTS = np.empty(0, dtype=_ELEM_DT)
+
+def _extract_with_plumber(page):
+    # One word pass feeds both views: the layout text is built from the same word map
+    # that page.extract_text(layout=True) would build, and the words become HTML elements.
+    # This mirrors pdfplumber's Page._get_textmap/chars_to_textmap (layout_bbox, width and
+    # height defaults, presorted=True) as of 0.11; check it against them when upgrading.
+    try:
+        wordmap = WordExtractor(x_tolerance=1, y_tolerance=1).extract_wordmap(page.chars)
+        text = wordmap.to_textmap(
+            layout=True, layout_bbox=page.bbox,
+            layout_width=page.width, layout_height=page.height,
+            y_tolerance=1, presorted=True,
+        ).as_string
+        if not text and page.chars:
+            # Text layer present but the layout pass is empty; plain extraction beats OCR.
+            text = page.extract_text(x_tolerance=1, y_tolerance=1)
+        words = [word for word, _ in wordmap.tuples]
+        elements = np.empty(len(words), dtype=_ELEM_DT)
+        elements['text'] = [word['text'] for word in words]
+        elements['x0'] = [word['x0'] for word in words]
+        elements['y0'] = [word['top'] for word in words]
+        elements['x1'] = [word['x1'] for word in words]
+        elements['y1'] = [word['bottom'] for word in words]
+        elements['source'] = _SOURCE_PLUMBER
+        return text, elements
+    except Exception as e:
+        print(f"Error extracting with pdfplumber on page {page.page_number}: {e}")
+        return "", _NO_ELEMENTS
+
+def _render_page(pdf, page_number, dpi=300):
+    # pdfium renders straight to a grayscale buffer, no Ghostscript subprocess.
+    # Returned as a numpy view of that buffer (no copy); page and bitmap are closed right away.
+    page = pdf[page_number - 1]
+    try:
+        bitmap = page.render(scale=dpi / 72, grayscale=True)
+        # The buffer is allocated by Python, so the view keeps it alive after close().
+        arr = bitmap.to_numpy()
+        bitmap.close()
+    finally:
+        page.close()
+    return arr
+
+# Fraction of dark pixels below which a rendered page counts as blank.
+_BLANK_PAGE_DENSITY = 0.0001
+_DARK_PIXEL_LEVEL = 200
+
+def _is_blank(arr):
+    density = np.count_nonzero(arr < _DARK_PIXEL_LEVEL) / arr.size
+    return density < _BLANK_PAGE_DENSITY
+
+def _otsu_threshold(hist):
+    # Between-class variance for every candidate threshold at once.
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist, dtype=np.float64)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_sum = np.cumsum(hist * levels)
+    mean_bg = cum_sum / np.maximum(weight_bg, 1)
+    mean_fg = (cum_sum[-1] - cum_sum) / np.maximum(weight_fg, 1)
+    variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(variance))
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _otsu_and_binarize(arr):
+        # Histogram, scan the 256 thresholds, then binarize, all in compiled loops.
+        rows, cols = arr.shape
+        hist = np.zeros(256, dtype=np.int64)
+        for y in range(rows):
+            for x in range(cols):
+                hist[arr[y, x]] += 1
+
+        total = rows * cols
+        sum_all = 0.0
+        for level in range(256):
+            sum_all += level * hist[level]
+        weight_bg = 0.0
+        sum_bg = 0.0
+        best_variance = -1.0
+        threshold = 0
+        for level in range(256):
+            weight_bg += hist[level]
+            if weight_bg == 0:
+                continue
+            weight_fg = total - weight_bg
+            if weight_fg == 0:
+                break
+            sum_bg += level * hist[level]
+            mean_bg = sum_bg / weight_bg
+            mean_fg = (sum_all - sum_bg) / weight_fg
+            variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+            if variance > best_variance:
+                best_variance = variance
+                threshold = level
+
+        binary = np.empty((rows, cols), dtype=np.uint8)
+        for y in range(rows):
+            for x in range(cols):
+                binary[y, x] = 255 if arr[y, x] > threshold else 0
+        return binary
+
+def _binarize(arr):
+    if numba is not None:
+        binary = _otsu_and_binarize(arr)
+    else:
+        hist = np.bincount(arr.ravel(), minlength=256)
+        threshold = _otsu_threshold(hist)
+        # Scale the boolean mask in place rather than allocating two more page-sized arrays.
+        binary = (arr > threshold).view(np.uint8)
+        binary *= 255
+    return Image.fromarray(binary, mode='L')
+
+def _elements_from_ocr_data(data, scale):
+    # Filter the TSV columns with one mask instead of converting word by word.
+    # Returns the elements grouped by page_num, the 1-based image index in the list file.
+    # Pixel boxes are multiplied by scale to get PDF points, like the pdfplumber words.
+    if not data:
+        return {}
+    page_nums = np.asarray(data['page_num'], dtype=np.int32)
+    texts = np.char.strip(np.asarray(data['text'], dtype=str))
+    confs = np.asarray(data['conf'], dtype=np.float32)
+    lefts = np.asarray(data['left'], dtype=np.float64)
+    tops = np.asarray(data['top'], dtype=np.float64)
+    rights = (lefts + np.asarray(data['width'], dtype=np.float64)) * scale
+    bottoms = (tops + np.asarray(data['height'], dtype=np.float64)) * scale
+    lefts *= scale
+    tops *= scale
+    keep = np.flatnonzero((confs > 50) & (texts != ''))
+    elements = np.empty(len(keep), dtype=_ELEM_DT)
+    elements['text'] = texts[keep].tolist()
+    elements['x0'] = lefts[keep]
+    elements['y0'] = tops[keep]
+    elements['x1'] = rights[keep]
+    elements['y1'] = bottoms[keep]
+    elements['source'] = _SOURCE_OCR
+    page_nums = page_nums[keep]
+    return {int(page_num): elements[page_nums == page_num] for page_num in np.unique(page_nums)}
+
+def _confidence_by_image(data):
+    # Mean word confidence per 1-based image number of a TSV result.
+    if not data:
+        return {}
+    page_nums = np.asarray(data['page_num'], dtype=np.int64)
+    confs = np.asarray(data['conf'], dtype=np.float64)
+    words = confs >= 0
+    totals = np.bincount(page_nums[words], weights=confs[words])
+    counts = np.bincount(page_nums[words])
+    return {int(n): float(totals[n] / counts[n]) for n in np.flatnonzero(counts)}
+
+def _elements_from_tess_api(api, scale):
+    # Words of the image last recognized by a tesserocr API, boxes scaled to PDF points.
+    iterator = api.GetIterator()
+    if iterator is None:
+        return _NO_ELEMENTS
+    rows = []
+    for word in iterate_level(iterator, RIL.WORD):
+        text = (word.GetUTF8Text(RIL.WORD) or "").strip()
+        if text and word.Confidence(RIL.WORD) > 50:
+            x0, y0, x1, y1 = word.BoundingBox(RIL.WORD)
+            rows.append((text, x0 * scale, y0 * scale, x1 * scale, y1 * scale, _SOURCE_OCR))
+    return np.array(rows, dtype=_ELEM_DT)
+
+def _elements_from_paddle(lines, scale):
+    # PaddleOCR lines ([4-point box, (text, score)]) as elements, boxes scaled to PDF points.
+    rows = []
+    for box, (text, score) in lines:
+        if text.strip() and score > 0.5:
+            xs = [x for x, _ in box]
+            ys = [y for _, y in box]
+            rows.append((text, min(xs) * scale, min(ys) * scale, max(xs) * scale, max(ys) * scale, _SOURCE_OCR))
+    return np.array(rows, dtype=_ELEM_DT)
+
+def _iter_rendered(pdf, page_numbers, dpi, prefetch=3, binarize=True):
+    # Render (+ binarize unless told not to) on a background thread while the caller OCRs earlier pages.
+    # pdfium is only touched by that thread; the bounded queue caps memory use.
+    # Blank pages are dropped here so they never reach Tesseract.
+    rendered = queue.Queue(maxsize=prefetch)
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for page_number in page_numbers:
+                if cancelled.is_set():
+                    break
+                arr = _render_page(pdf, page_number, dpi)
+                if _is_blank(arr):
+                    continue
+                # fromarray wraps the contiguous buffer without copying it.
+                rendered.put((page_number, _binarize(arr) if binarize else Image.fromarray(arr, mode='L')))
+        finally:
+            rendered.put(None)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        producer = executor.submit(produce)
+        try:
+            while (item := rendered.get()) is not None:
+                yield item
+            # Re-raise any rendering error from the background thread.
+            producer.result()
+        finally:
+            cancelled.set()
+            # Unblock the producer if the consumer stopped early.
+            while not producer.done():
+                try:
+                    rendered.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+def _ocr_cache_key(image, backend, dpi):
+    # Hash of the rendered pixels, so repeated pages (letterheads, disclaimers) share an entry.
+    # Personalized so these (text, elements, conf) entries never collide with OCR8's
+    # text-only ones when both scripts use the same cache folder.
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16, person=b'OCR9 elements')
+    digest.update(f"{backend}:{dpi}:{image.mode}:{image.width}x{image.height}".encode())
+    return digest.hexdigest()
+
+def _page_items(data):
+    # save_* take a {page: value} dict or an iterable of (page, value) pairs.
+    return data.items() if isinstance(data, dict) else data
+
+def _process_window(page_numbers, ocr):
+    # pdfplumber for every page of the window, then one OCR pass for the empty ones,
+    # so OCR runs on all cores. With ocr=False the empty pages are left to the caller.
+    extractor = _worker_extractor
+    window = []
+    for page_number in page_numbers:
+        page = extractor._pdf.pages[page_number - 1]
+        try:
+            window.append((page_number, *_extract_with_plumber(page)))
+        finally:
+            # The worker's PDF stays open, so free the page's objects and text map cache.
+            page.close()
+    return list(extractor._fill_with_ocr(window)) if ocr else window
+
+# OCR runs at ocr_dpi first; pages whose mean word confidence is below the
+# threshold are rendered and OCR'd again at the fallback resolution.
+_OCR_FALLBACK_DPI = 300
+_OCR_MIN_CONFIDENCE = 70
+
+# Pool tasks are windows of this many pages: one OCR pass (and Tesseract startup) per
+# window, small enough windows to keep every core busy.
+_PAGE_WINDOW = 8
+# Windows submitted ahead per worker; bounds how many finished pages wait in memory.
+_WINDOWS_PER_WORKER = 2
+
+# LSTM engine only, single text block, runs of spaces kept so columns stay aligned.
+_TESS_VARIABLES = {'preserve_interword_spaces': '1'}
+_TESS_CONFIG = '--oem 1 --psm 6 -c preserve_interword_spaces=1'
+_TESS_LANG = 'eng'
+_PADDLE_LANG = 'en'
+# Part of every OCR cache key, so a different backend, language or config never hits old entries.
+_TESSEROCR_CACHE_ID = f"tesserocr:{_TESS_LANG}:{_TESS_CONFIG}"
+_TESSERACT_CACHE_ID = f"tesseract:{_TESS_LANG}:{_TESS_CONFIG}"
+_PADDLE_CACHE_ID = f"paddle:{_PADDLE_LANG}:use_angle_cls"
+
+_HTML_HEADER = """<html><head><meta charset='utf-8'><title>PDF Extraction</title></head><body>
+<style>
+body { font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f0f0f0; }
+.page { position: relative; margin: 20px auto; background-color: #fff; border: 1px solid #ccc; box-shadow: 0 0 10px rgba(0,0,0,0.1); padding: 50px; box-sizing: border-box; }
+.text-element { position: absolute; font-size: 12px; white-space: pre-wrap; margin: 0; padding: 0; }
+</style>
+"""
+_HTML_FOOTER = "</body></html>"
+# Single-pass escaping for element content (no attribute values are escaped).
+_HTML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+# Bound str.format templates, filled once per page and once per word.
+_HTML_PAGE_START = '<div class="page" style="width: {width}px; height: {height}px;">\n'.format
+_HTML_TEXT_ELEMENT = (
+    '<p class="text-element" style="left: {x0}px; top: {y0}px;width: {width}px;height: {height}px;">'
+    '{text}</p>\n'
+).format
+
+# Raw WordprocessingML per page: Heading 1, the text run, then a page break.
+# Newlines/tabs map to <w:br/>/<w:tab/>; control characters XML can't carry are dropped.
+_DOCX_RUN_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+_DOCX_ESCAPE = str.maketrans({
+    **{chr(c): None for c in range(32)},
+    '&': '&amp;', '<': '&lt;', '>': '&gt;',
+    '\n': _DOCX_RUN_BREAK, '\r': _DOCX_RUN_BREAK,
+    '\t': '</w:t><w:tab/><w:t xml:space="preserve">',
+})
+_DOCX_PAGE = (
+    '<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Page {page_num}</w:t></w:r></w:p>'
+    '<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+    '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+).format
+
+# iter_pages failed after some pages had already been yielded.
+class ExtractionError(Exception):
+    pass
+
 class PDFExtractor:
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, ocr_dpi=200, engine='tesseract', ocr_cache_dir='.ocr_cache'):
+        # engine='paddle' uses PaddleOCR, on the GPU when paddle is built with CUDA.
+        if engine not in ('tesseract', 'paddle'):
+            raise ValueError(f"Unknown OCR engine: {engine!r}. Supported engines are: tesseract, paddle.")
+        if engine == 'paddle':
+            _check_paddleocr()
         self.pdf_path = pdf_path
-
-    def _extract_with_plumber(self, page):
+        self.ocr_dpi = ocr_dpi
+        self.engine = engine
+        self._tess_api = None
+        self._paddle = None
+        # On-disk OCR results keyed by page image hash, shared between runs.
+        self.ocr_cache_dir = ocr_cache_dir
+        self._ocr_cache = None
+        # Parsed once and reused by every extract call until close().
+        self._pdf = None
+        self._pdfium = None
+        self._open_error = None
         try:
-            text = page.extract_text(x_tolerance=1, y_tolerance=1, layout=True)
-            return text if text else ""
+            self._pdf = pdfplumber.open(pdf_path)
+            self._pdfium = pdfium.PdfDocument(pdf_path)
         except Exception as e:
-            print(f"Error extracting with pdfplumber on page {page.page_number}: {e}")
-            return ""
+            # Raised again from the extract methods so it is reported the usual way.
+            self._open_error = e
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+        if self._pdfium is not None:
+            self._pdfium.close()
+            self._pdfium = None
+        if self._tess_api is not None:
+            self._tess_api.End()
+            self._tess_api = None
+        self._paddle = None
+        if self._ocr_cache is not None:
+            self._ocr_cache.close()
+            self._ocr_cache = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_tess_api(self):
+        if self._tess_api is None:
+            self._tess_api = PyTessBaseAPI(
+                lang=_TESS_LANG, psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY, variables=_TESS_VARIABLES,
+            )
+        return self._tess_api
+
+    def _get_ocr_cache(self):
+        # LRU eviction past diskcache's size limit (1 GB by default).
+        if self._ocr_cache is None:
+            self._ocr_cache = diskcache.Cache(self.ocr_cache_dir, eviction_policy='least-recently-used')
+        return self._ocr_cache
+
+    def _get_paddle(self):
+        if self._paddle is None:
+            # Optional and slow to import, so it is imported on first use instead of
+            # at module level, where every pool worker would pay for it.
+            try:
+                from paddleocr import PaddleOCR
+            except ImportError:
+                raise RuntimeError("PaddleOCR is not installed. Install 'paddleocr<3' or use engine='tesseract'.")
+            # use_gpu falls back to the CPU when paddle was built without CUDA.
+            self._paddle = PaddleOCR(use_angle_cls=True, lang=_PADDLE_LANG, use_gpu=True, show_log=False)
+        return self._paddle
 
-    def _extract_with_ocr(self, page):
+    def _ocr_paddle(self, pdf, page_numbers, dpi):
+        # Grayscale input: the detection model does its own thresholding.
+        paddle = self._get_paddle()
+        cache = self._get_ocr_cache()
+        extracted_data = {}
+        for page_number, image in _iter_rendered(pdf, page_numbers, dpi, binarize=False):
+            key = _ocr_cache_key(image, _PADDLE_CACHE_ID, dpi)
+            if (cached := cache.get(key)) is not None:
+                extracted_data[page_number] = cached
+                continue
+            try:
+                # Detected lines come back top to bottom as [box, (text, score)] with scores in 0-1.
+                lines = paddle.ocr(np.asarray(image.convert('RGB')), cls=True)[0] or []
+                text = "\n".join(line_text for _, (line_text, _) in lines)
+                conf = 100 * sum(score for _, (_, score) in lines) / len(lines) if lines else 0
+                extracted_data[page_number] = cache[key] = (text, _elements_from_paddle(lines, 72 / dpi), conf)
+            except Exception as e:
+                # A bad page only loses its own OCR, not the rest of the window's.
+                print(f"Error extracting with OCR on page {page_number}: {e}")
+        return extracted_data
+
+    def _ocr_in_process(self, pdf, page_numbers, dpi):
+        api = self._get_tess_api()
+        cache = self._get_ocr_cache()
+        extracted_data = {}
+        for page_number, image in _iter_rendered(pdf, page_numbers, dpi):
+            key = _ocr_cache_key(image, _TESSEROCR_CACHE_ID, dpi)
+            if (cached := cache.get(key)) is not None:
+                extracted_data[page_number] = cached
+                continue
+            try:
+                api.SetImage(image)
+                text = api.GetUTF8Text()
+                extracted_data[page_number] = cache[key] = (
+                    text, _elements_from_tess_api(api, 72 / dpi), api.MeanTextConf()
+                )
+            except Exception as e:
+                print(f"Error extracting with OCR on page {page_number}: {e}")
+        return extracted_data
+
+    def _ocr_batched(self, pdf, page_numbers, dpi):
+        # Render every page to a temp folder and OCR them all through a Tesseract list file,
+        # so process startup and model loading are paid once instead of once per page.
+        cache = self._get_ocr_cache()
+        extracted_data = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Only cache misses go into the list file, in this order.
+            ocr_pages, keys, image_paths = [], [], []
+            # Identical pages are OCR'd once; repeats copy the first page's result.
+            first_page_by_key, repeats = {}, []
+            for page_number, image in _iter_rendered(pdf, page_numbers, dpi):
+                key = _ocr_cache_key(image, _TESSERACT_CACHE_ID, dpi)
+                if (cached := cache.get(key)) is not None:
+                    extracted_data[page_number] = cached
+                    continue
+                if key in first_page_by_key:
+                    repeats.append((page_number, first_page_by_key[key]))
+                    continue
+                first_page_by_key[key] = page_number
+                image_path = os.path.join(tmp_dir, f"page_{page_number}.png")
+                image.save(image_path, compress_level=1)
+                ocr_pages.append(page_number)
+                keys.append(key)
+                image_paths.append(image_path)
+            if not image_paths:
+                return extracted_data
+
+            list_path = os.path.join(tmp_dir, "pages.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(image_paths))
+
+            # A single run writes both the plain text and the TSV word boxes.
+            output_base = os.path.join(tmp_dir, "ocr")
+            pytesseract.pytesseract.run_tesseract(
+                list_path, output_base, extension='txt', lang=_TESS_LANG,
+                config=f'{_TESS_CONFIG} -c tessedit_create_tsv=1',
+            )
+            with open(f"{output_base}.txt", encoding='utf-8') as f:
+                text = f.read()
+            with open(f"{output_base}.tsv", encoding='utf-8') as f:
+                data = pytesseract.pytesseract.file_to_dict(f.read(), '\t', -1)
+        words = _elements_from_ocr_data(data, 72 / dpi)
+        confidences = _confidence_by_image(data)
+        # Tesseract ends the output of every image in the list with a form feed.
+        for image_num, (page_number, key, page_text) in enumerate(zip(ocr_pages, keys, text.split("\f")), start=1):
+            extracted_data[page_number] = cache[key] = (
+                page_text, words.get(image_num, _NO_ELEMENTS), confidences.get(image_num, 0)
+            )
+        for page_number, first_page in repeats:
+            extracted_data[page_number] = extracted_data[first_page]
+        return extracted_data
+
+    def _extract_with_ocr(self, page_numbers):
+        if self.engine == 'paddle':
+            ocr_pass = self._ocr_paddle
+        elif PyTessBaseAPI is not None:
+            ocr_pass = self._ocr_in_process
+        else:
+            ocr_pass = self._ocr_batched
         try:
-            pil_image = page.to_image(resolution=300).original
-            text = pytesseract.image_to_string(pil_image, lang='eng')
-            return text if text else ""
+            results = ocr_pass(self._pdfium, page_numbers, self.ocr_dpi)
         except pytesseract.TesseractNotFoundError:
             print("Tesseract is not installed or not in your PATH. Please install it.")
-            return ""
+            return {}
         except Exception as e:
-            print(f"Error extracting with OCR on page {page.page_number}: {e}")
-            return ""
-    
-    def extract_data_layout_preserved(self):
-        extracted_data = {}
+            print(f"Error extracting with OCR: {e}")
+            return {}
+        if self.ocr_dpi < _OCR_FALLBACK_DPI:
+            retry_pages = [page_number for page_number, (_, _, conf) in results.items()
+                           if conf < _OCR_MIN_CONFIDENCE]
+            if retry_pages:
+                # If the retry fails, the pages keep their first-pass text.
+                try:
+                    results.update(ocr_pass(self._pdfium, retry_pages, _OCR_FALLBACK_DPI))
+                except Exception as e:
+                    print(f"Error retrying OCR at {_OCR_FALLBACK_DPI} DPI: {e}")
+        return {page_number: (text, elements) for page_number, (text, elements, _) in results.items()}
+
+    def _fill_with_ocr(self, window):
+        # OCR the pages of a window that came back without text or words, keep the order.
+        ocr_pages = [page_number for page_number, text, elements in window if not text or not len(elements)]
+        ocr_data = self._extract_with_ocr(ocr_pages) if ocr_pages else {}
+        for page_number, text, elements in window:
+            if page_number in ocr_data:
+                ocr_text, ocr_elements = ocr_data[page_number]
+                text = text or ocr_text
+                if not len(elements):
+                    elements = ocr_elements
+            yield page_number, text, elements
+
+    def iter_pages(self):
+        # Yields (page_number, text, elements) in page order as soon as each window is done,
+        # so output can be written while the rest of the document is still being extracted.
+        # Workers OCR their own windows; PaddleOCR runs here so the GPU model is loaded once.
+        # A failure after pages were yielded raises ExtractionError so they aren't taken as complete.
+        pages_yielded = False
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                for page in pdf.pages:
-                    plumber_text = self._extract_with_plumber(page)
-                    
-                    if plumber_text:
-                        extracted_data[page.page_number] = plumber_text
-                    else:
-                        ocr_text = self._extract_with_ocr(page)
-                        extracted_data[page.page_number] = ocr_text
+            if self._open_error is not None:
+                raise self._open_error
+            page_count = len(self._pdf.pages)
+
+            ocr_in_workers = self.engine != 'paddle'
+            max_workers = os.cpu_count() or 1
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(self.pdf_path, self.ocr_dpi, self.engine, self.ocr_cache_dir),
+            ) as executor:
+                windows = (range(start, min(start + _PAGE_WINDOW, page_count + 1))
+                           for start in range(1, page_count + 1, _PAGE_WINDOW))
+                pending = collections.deque(
+                    executor.submit(_process_window, window, ocr_in_workers)
+                    for window in itertools.islice(windows, max_workers * _WINDOWS_PER_WORKER)
+                )
+                try:
+                    while pending:
+                        window = pending.popleft().result()
+                        for next_window in itertools.islice(windows, 1):
+                            pending.append(executor.submit(_process_window, next_window, ocr_in_workers))
+                        pages_yielded = True
+                        if ocr_in_workers:
+                            yield from window
+                        else:
+                            yield from self._fill_with_ocr(window)
+                finally:
+                    # Stopped early (or failed): drop the windows no worker has started yet.
+                    for future in pending:
+                        future.cancel()
 
             print("PDF extraction completed successfully!")
-            return extracted_data
         except FileNotFoundError:
             print(f"Error: The file at {self.pdf_path} was not found.")
-            return {}
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            return {}
+            if pages_yielded:
+                raise ExtractionError(f"Extraction of {self.pdf_path} failed partway through: {e}") from e
 
-    def extract_elements_for_html(self):
-        extracted_elements = {}
+    def extract_all(self):
+        # Layout text and HTML elements for every page, collected from iter_pages;
+        # empty if the extraction failed.
+        layout_data, html_data = {}, {}
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                for page in pdf.pages:
-                    elements = []
-                    words = page.extract_words(x_tolerance=1, y_tolerance=1)
-                    if words:
-                        for word in words:
-                            elements.append({
-                                'text': word['text'],
-                                'x0': word['x0'], 'y0': word['top'],
-                                'x1': word['x1'], 'y1': word['bottom'],
-                                'source': 'plumber'
-                            })
-                    else:
-                        pil_image = page.to_image(resolution=300).original
-                        data = pytesseract.image_to_data(pil_image, output_type=pytesseract.Output.DICT)
-                        for i in range(len(data['text'])):
-                            text = str(data['text'][i]).strip()
-                            conf = float(data['conf'][i]) if data['conf'][i] != '-1' else 0
-                            if text and conf > 50:
-                                x, y, w, h = int(data['left'][i]), int(data['top'][i]), int(data['width'][i]), int(data['height'][i])
-                                elements.append({
-                                    'text': text,
-                                    'x0': x, 'y0': y,
-                                    'x1': x + w, 'y1': y + h,
-                                    'source': 'ocr'
-                                })
-                    extracted_elements[page.page_number] = elements
-            return extracted_elements
-        except FileNotFoundError:
-            print(f"Error: The file at {self.pdf_path} was not found.")
-            return {}
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            return {}
+            for page_number, text, elements in self.iter_pages():
+                layout_data[page_number] = text
+                html_data[page_number] = elements
+        except ExtractionError:
+            return {}, {}
+        return layout_data, html_data
+
+    def extract_data_layout_preserved(self):
+        return self.extract_all()[0]
+
+    def extract_elements_for_html(self):
+        return self.extract_all()[1]
 
     def save_to_docx(self, data, output_filename):
         document = Document()
-        for page_num, content in data.items():
-            document.add_heading(f"Page {page_num}", level=1)
-            document.add_paragraph(content)
-            document.add_page_break()
+        # One parse for all pages; sectPr is moved back to stay the body's last child
+        pages = ''.join(_DOCX_PAGE(page_num=page_num, text=content.translate(_DOCX_ESCAPE))
+                        for page_num, content in _page_items(data))
+        body = document.element.body
+        sect_pr = body.sectPr
+        body.extend(parse_xml(f'<w:body {nsdecls("w")}>{pages}</w:body>'))
+        if sect_pr is not None:
+            body.append(sect_pr)
         document.save(output_filename)
         print(f"Data saved to {output_filename} successfully!")
 
     def save_to_txt(self, data, output_filename):
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            for page_num, content in data.items():
-                f.write(f"--- Page {page_num} ---\n")
-                f.write(content)
-                f.write("\n\n")
+        with open(output_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(f"--- Page {page_num} ---\n{content}\n\n" for page_num, content in _page_items(data))
         print(f"Data saved to {output_filename} successfully!")
 
     def save_to_html(self, data, output_filename):
-        html_content = ["<html><head><meta charset='utf-8'><title>PDF Extraction</title></head><body>"]
-        html_content.append("<style>")
-        html_content.append("body { font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f0f0f0; }")
-        html_content.append(".page { position: relative; margin: 20px auto; background-color: #fff; border: 1px solid #ccc; box-shadow: 0 0 10px rgba(0,0,0,0.1); padding: 50px; box-sizing: border-box; }")
-        html_content.append(".text-element { position: absolute; font-size: 12px; white-space: pre-wrap; margin: 0; padding: 0; }")
-        html_content.append("</style>")
-
-        for page_num, elements in data.items():
-            if not elements:
-                continue
+        # Written straight into a large buffered file instead of joining one big string in memory.
+        with open(output_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(_HTML_HEADER)
+            for page_num, elements in _page_items(data):
+                if not len(elements):
+                    continue
+
+                max_x = elements['x1'].max()
+                max_y = elements['y1'].max()
+
+                f.write(_HTML_PAGE_START(width=max_x, height=max_y))
+                # Column-wise arithmetic, then plain Python floats for formatting.
+                for text, x0, y0, width, height in zip(
+                    elements['text'].tolist(), elements['x0'].tolist(), elements['y0'].tolist(),
+                    (elements['x1'] - elements['x0']).tolist(), (elements['y1'] - elements['y0']).tolist(),
+                ):
+                    f.write(_HTML_TEXT_ELEMENT(
+                        x0=x0, y0=y0, width=width, height=height,
+                        text=text.translate(_HTML_ESCAPE),
+                    ))
+                f.write('</div>\n')
+            f.write(_HTML_FOOTER)
 
-            max_x = max(e['x1'] for e in elements)
-            max_y = max(e['y1'] for e in elements)
-
-            html_content.append(f'<div class="page" style="width: {max_x}px; height: {max_y}px;">')
-            
-            for element in elements:
-                safe_text = html.escape(element['text'])
-                style = f"left: {element['x0']}px; top: {element['y0']}px;"
-                style += f"width: {element['x1'] - element['x0']}px;"
-                style += f"height: {element['y1'] - element['y0']}px;"
-                
-                html_content.append(f'<p class="text-element" style="{style}">{safe_text}</p>')
-            
-            html_content.append('</div>')
-
-        html_content.append("</body></html>")
-        
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(html_content))
-            
         print(f"Data saved to {output_filename} successfully!")
 
 def main():
@@ -151,25 +672,35 @@ def main():
         print(f"Error: The file '{pdf_path}' does not exist.")
         return
 
-    extractor = PDFExtractor(pdf_path)
-    layout_data = extractor.extract_data_layout_preserved()
-    html_elements_data = extractor.extract_elements_for_html()
-
-    if not layout_data:
-        print("No data was extracted. Exiting.")
-        return
-
+    # Asked before extracting so pages are written out as they come.
     output_filename = input("Enter the desired output filename (e.g., 'report'): ").strip()
     output_format = input("Choose output format (docx, txt, html): ").strip().lower()
-
-    if output_format == 'docx':
-        extractor.save_to_docx(layout_data, f"{output_filename}.docx")
-    elif output_format == 'txt':
-        extractor.save_to_txt(layout_data, f"{output_filename}.txt")
-    elif output_format == 'html':
-        extractor.save_to_html(html_elements_data, f"{output_filename}.html")
-    else:
+    if output_format not in ('docx', 'txt', 'html'):
         print("Invalid output format chosen. Supported formats are: docx, txt, html.")
+        return
+
+    with PDFExtractor(pdf_path) as extractor:
+        pages = extractor.iter_pages()
+        first_page = next(pages, None)
+
+        if first_page is None:
+            print("No data was extracted. Exiting.")
+            return
+
+        pages = itertools.chain([first_page], pages)
+        output_path = f"{output_filename}.{output_format}"
+        try:
+            if output_format == 'docx':
+                extractor.save_to_docx(((page, text) for page, text, _ in pages), output_path)
+            elif output_format == 'txt':
+                extractor.save_to_txt(((page, text) for page, text, _ in pages), output_path)
+            else:
+                extractor.save_to_html(((page, elements) for page, _, elements in pages), output_path)
+        except ExtractionError:
+            # TXT/HTML are written page by page, so remove the truncated file (DOCX saves at the end).
+            if output_format != 'docx' and os.path.exists(output_path):
+                os.remove(output_path)
+            print(f"Extraction failed partway through; {output_path} was not saved.")
 
 if __name__ == "__main__":
     main()